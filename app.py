@@ -1,17 +1,35 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify
+from flask import Flask, render_template, request, redirect, url_for, jsonify, Response, session, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import make_transient_to_detached
 import requests
-from datetime import datetime
+from datetime import datetime, timedelta
+import base64
+import bisect
+import gzip
 import random
+import re
+import secrets
+import string
+import json
+import math
+import queue
+import threading
+import time
 import os
 import sys
+import atexit
 import logging
+from functools import wraps
 from dotenv import load_dotenv
 
 load_dotenv()
 from config import Config
+from cache import create_cache, MISSING
+from migrations import run_migrations, verify_query_plans
 
 # ==================== LOGGING SETUP ====================
 
@@ -35,11 +53,34 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+cache = create_cache(app.config)
+
 API_KEY = os.getenv('WEATHER_API_KEY')
 WEATHER_API_URL = "https://api.weatherapi.com/v1/forecast.json"
 WEATHER_FORECAST_DAYS = 4
+WEATHER_CACHE_SECONDS = 10 * 60
+LEADERBOARD_CACHE_SECONDS = 15
+USER_CACHE_SECONDS = 5 * 60
 QUIZ_POINTS_PER_QUESTION = 10
 LEADERBOARD_LIMIT = 10
+QUIZ_TOKEN_MAX_AGE = 5 * 60
+QUESTION_STATS_FLUSH_SECONDS = 30
+QUESTION_SKILL_BANDS = 5
+QUESTION_SKILL_ALPHA = 0.2
+QUESTION_DIFFICULTY_SPREAD = 0.2
+QUESTION_DIFFICULTY_BINS = 20
+QUESTION_MIN_WEIGHT = 0.05
+QUESTION_SEARCH_PAGE_SIZE = 20
+QUESTION_SEARCH_MAX_PAGE_SIZE = 100
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+HISTORY_CHART_DAYS = 30
+HISTORY_MAX_CHART_DAYS = 365
+ROOM_CODE_LENGTH = 6
+ROOM_ANSWER_SECONDS = 20
+ROOM_MAX_PLAYERS = 500
+ROOM_IDLE_SECONDS = 2 * 60 * 60
+ROOM_KEEPALIVE_SECONDS = 15
 
 # ==================== MODELS ====================
 
@@ -50,9 +91,10 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
     nickname = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
-    total_score = db.Column(db.Integer, default=0)
+    total_score = db.Column(db.Integer, default=0, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    scores = db.relationship('UserScore', backref='user', lazy=True, cascade='all, delete-orphan')
+    scores = db.relationship('UserScore', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    daily_scores = db.relationship('UserScoreDaily', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -60,9 +102,12 @@ class User(UserMixin, db.Model):
 
 class QuizQuestion(db.Model):
     __tablename__ = 'quiz_question'
+    __table_args__ = (
+        db.Index('ix_quiz_question_topic_id', 'topic', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    topic = db.Column(db.String(100), nullable=False, index=True)
+    topic = db.Column(db.String(100), nullable=False)
     question = db.Column(db.String(500), nullable=False)
     option_a = db.Column(db.String(255), nullable=False)
     option_b = db.Column(db.String(255), nullable=False)
@@ -83,23 +128,95 @@ class QuizQuestion(db.Model):
         }
 
 
+class QuestionStats(db.Model):
+    __tablename__ = 'question_stats'
+    
+    question_id = db.Column(db.Integer, db.ForeignKey('quiz_question.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<QuestionStats question_id={self.question_id}, {self.correct}/{self.attempts}>'
+
+
 class UserScore(db.Model):
     __tablename__ = 'user_score'
+    __table_args__ = (
+        # Covers history pages: seek by user, ordered by (date_taken, id), score included
+        db.Index('ix_user_score_user_date_id', 'user_id', 'date_taken', 'id', 'score'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     score = db.Column(db.Integer, nullable=False)
     date_taken = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     def __repr__(self):
         return f'<UserScore user_id={self.user_id}, score={self.score}>'
 
+
+class UserScoreDaily(db.Model):
+    __tablename__ = 'user_score_daily'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_user_score_daily_user_day'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    answers = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UserScoreDaily user_id={self.user_id}, day={self.day}, points={self.points}>'
+
 # ==================== LOGIN MANAGER ====================
 
+def user_cache_key(user_id):
+    return f'user:{user_id}'
+
+
+def question_cache_key(question_id):
+    return f'question:{question_id}'
+
+
+def cache_user(user):
+    """Write-through user row to the cache (password hash is never cached)"""
+    cache.set(user_cache_key(user.id), {
+        'id': user.id,
+        'username': user.username,
+        'nickname': user.nickname,
+        'total_score': user.total_score,
+        'created_at': user.created_at
+    }, USER_CACHE_SECONDS)
+
+
 @login_manager.user_loader
 def load_user(user_id):
     """Load user by ID for Flask-Login"""
-    return User.query.get(int(user_id))
+    data = cache.get(user_cache_key(user_id))
+    if data is MISSING:
+        user = db.session.get(User, int(user_id))
+        if user:
+            cache_user(user)
+        return user
+    
+    # Attach cached row to the session without a SELECT; unloaded columns
+    # (password) are fetched lazily if something needs them
+    user = User(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def admin_required(view):
+    """Allow only logged-in users listed in ADMIN_USERNAMES"""
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if current_user.username not in app.config['ADMIN_USERNAMES']:
+            return jsonify({'error': 'Akses khusus admin'}), 403
+        return view(*args, **kwargs)
+    return wrapper
 
 # ==================== WEATHER SERVICE ====================
 
@@ -121,6 +238,11 @@ class WeatherService:
             error = "Weather API key not configured"
             return None, error
         
+        cache_key = f'weather:{city.lower()}'
+        weather_data = cache.get(cache_key)
+        if weather_data is not MISSING:
+            return weather_data, None
+        
         try:
             params = {
                 'key': API_KEY,
@@ -133,7 +255,10 @@ class WeatherService:
             response = requests.get(WEATHER_API_URL, params=params, timeout=5)
             response.raise_for_status()
             
-            return WeatherService._parse_forecast(response.json()), None
+            weather_data = WeatherService._parse_forecast(response.json())
+            if weather_data:
+                cache.set(cache_key, weather_data, WEATHER_CACHE_SECONDS)
+            return weather_data, None
         
         except requests.exceptions.RequestException as e:
             return None, f"Weather service error: {str(e)}"
@@ -168,43 +293,1197 @@ class WeatherService:
 class QuizService:
     """Service for quiz operations"""
     
+    _answer_key = None
+    _changed_ids = set()
+    _changed_lock = threading.Lock()
+    
     @staticmethod
-    def get_random_question():
-        """Get random quiz question"""
-        questions = QuizQuestion.query.all()
-        if not questions:
-            return None
-        return random.choice(questions)
+    def _token_serializer():
+        return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='quiz-question')
     
     @staticmethod
-    def check_answer(question_id, answer):
+    def get_random_question(user_id=None):
+        """Get random quiz question, weighted towards the player's skill level"""
+        for _ in range(2):
+            question_id = QuestionStatsService.sample_question_id(user_id)
+            if question_id is None:
+                return None
+            
+            question = db.session.get(QuizQuestion, question_id)
+            if question:
+                return question
+            
+            # Question was deleted since the answer key was loaded
+            QuizService.get_answer_key(refresh=True)
+            QuestionStatsService.invalidate()
+        return None
+    
+    @staticmethod
+    def get_answer_key(refresh=False):
         """
-        Validate user answer
+        Return in-memory mapping of question id to correct answer
+        
+        Questions written on another worker arrive as cache invalidations
+        and are re-read by id before the key is used.
+        """
+        if QuizService._answer_key is None or refresh:
+            with QuizService._changed_lock:
+                QuizService._changed_ids = set()
+            rows = db.session.query(QuizQuestion.id, QuizQuestion.correct_answer).all()
+            QuizService._answer_key = {question_id: correct for question_id, correct in rows}
+        elif QuizService._changed_ids:
+            with QuizService._changed_lock:
+                changed_ids = QuizService._changed_ids
+                QuizService._changed_ids = set()
+            QuizService._apply_changes(changed_ids)
+        return QuizService._answer_key
+    
+    @staticmethod
+    def _on_cache_invalidate(keys):
+        """Queue question ids another worker wrote (runs on the cache listener thread)"""
+        question_ids = {int(key.split(':', 1)[1]) for key in keys if key.startswith('question:')}
+        if question_ids:
+            with QuizService._changed_lock:
+                QuizService._changed_ids |= question_ids
+    
+    @staticmethod
+    def _apply_changes(question_ids):
+        """Re-read only the changed questions into the answer key, sampler and search index"""
+        questions = QuizQuestion.query.filter(QuizQuestion.id.in_(question_ids)).all()
+        answer_key = QuizService._answer_key
+        for question in questions:
+            answer_key[question.id] = question.correct_answer
+            QuestionSearchService.index_question(question)
+        
+        removed = set(question_ids) - {question.id for question in questions}
+        for question_id in removed:
+            answer_key.pop(question_id, None)
+            QuestionSearchService.unindex_question(question_id)
+        QuestionStatsService.update_questions([question.id for question in questions], removed)
+    
+    @staticmethod
+    def issue_question_token(question, user_id):
+        """Sign (question id, user id, nonce); the serializer adds the issued-at time"""
+        answer_key = QuizService.get_answer_key()
+        if question.id not in answer_key:
+            answer_key[question.id] = question.correct_answer
+        
+        payload = [question.id, user_id, secrets.token_urlsafe(6)]
+        return QuizService._token_serializer().dumps(payload)
+    
+    @staticmethod
+    def _token_claim_key(question_id, user_id, nonce):
+        """
+        Cache key marking a token as scored
+        
+        Keyed on the decoded payload rather than the token string, since
+        several encodings of the same signature verify. The claim lives in
+        the shared cache, so it holds across workers when one is configured.
+        """
+        return f'quiz-token:{question_id}:{user_id}:{nonce}'
+    
+    @staticmethod
+    def check_answer(token, user, answer):
+        """
+        Validate user answer against a signed question token and score it
+        
+        The token is claimed before the score is written and released again
+        if the write fails, so a retry after a 503 is scored instead of
+        being rejected as already answered.
         
         Returns:
-            tuple: (is_correct, correct_answer, question_object)
+            tuple: (is_correct, correct_answer, error_message)
         """
-        question = QuizQuestion.query.get(question_id)
-        if not question:
-            return None, None, None
+        user_id = user.id
+        try:
+            question_id, token_user_id, nonce = QuizService._token_serializer().loads(
+                token or '', max_age=QUIZ_TOKEN_MAX_AGE
+            )
+        except SignatureExpired:
+            return None, None, 'Waktu menjawab pertanyaan sudah habis'
+        except (BadSignature, TypeError, ValueError):
+            return None, None, 'Token pertanyaan tidak valid'
+        
+        if token_user_id != user_id:
+            return None, None, 'Token pertanyaan tidak valid'
+        
+        correct_answer = QuizService.get_answer_key().get(question_id)
+        if correct_answer is None:
+            correct_answer = QuizService.get_answer_key(refresh=True).get(question_id)
+            if correct_answer is None:
+                return None, None, 'Pertanyaan tidak ditemukan'
+        
+        claim_key = QuizService._token_claim_key(question_id, user_id, nonce)
+        if not cache.claim(claim_key, QUIZ_TOKEN_MAX_AGE):
+            return None, None, 'Jawaban untuk pertanyaan ini sudah dinilai'
         
-        is_correct = answer.upper() == question.correct_answer
-        return is_correct, question.correct_answer, question
+        is_correct = (answer or '').upper() == correct_answer
+        if is_correct:
+            try:
+                QuizService.update_user_score(user, QUIZ_POINTS_PER_QUESTION)
+            except Exception:
+                cache.release(claim_key)
+                raise
+        
+        QuestionStatsService.record(question_id, user_id, is_correct)
+        return is_correct, correct_answer, None
     
     @staticmethod
     def update_user_score(user, points):
         """Update user score after correct answer"""
-        user.total_score += points
+        # Increment in SQL so a cached (possibly stale) total is never written back
+        user.total_score = User.total_score + points
+        db.session.add(UserScore(user_id=user.id, score=points))
+        db.session.commit()
+        cache_user(user)
+    
+    @staticmethod
+    def get_leaderboard(limit=LEADERBOARD_LIMIT):
+        """Get top players leaderboard (cached for LEADERBOARD_CACHE_SECONDS)"""
+        def load():
+            players = db.session.query(User).order_by(User.total_score.desc()).limit(limit).all()
+            return [
+                {
+                    'id': player.id,
+                    'nickname': player.nickname,
+                    'total_score': player.total_score,
+                    'created_at': player.created_at
+                }
+                for player in players
+            ]
+        
+        return cache.get_or_set(f'leaderboard:{limit}', load, LEADERBOARD_CACHE_SECONDS)
+
+
+cache.subscribe(QuizService._on_cache_invalidate)
+
+# ==================== ADAPTIVE DIFFICULTY ====================
+
+class AliasTable:
+    """Walker/Vose alias table for O(1) weighted sampling"""
+    
+    def __init__(self, items, weights):
+        self.items = list(items)
+        count = len(self.items)
+        self.prob = [0.0] * count
+        self.alias = [0] * count
+        if not count:
+            return
+        
+        total = float(sum(weights))
+        scaled = [w * count / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        
+        for i in small + large:
+            self.prob[i] = 1.0
+    
+    def sample(self):
+        """Draw one item; returns None for an empty table"""
+        if not self.items:
+            return None
+        i = random.randrange(len(self.items))
+        return self.items[i] if random.random() < self.prob[i] else self.items[self.alias[i]]
+
+
+class QuestionStatsService:
+    """
+    Per-question attempt/correct counters and skill-matched question sampling
+    
+    Counters live in memory and are written to question_stats at most every
+    QUESTION_STATS_FLUSH_SECONDS. Questions are kept in difficulty bins and
+    an answer moves its question between bins in O(1). Players are grouped
+    into skill bands; each band has a small alias table over the bins,
+    weighted towards bins close to the band, so drawing a question is O(1)
+    and no work on the request path grows with the number of questions.
+    """
+    
+    _stats = None
+    _pending = {}
+    _skills = {}
+    _bins = [[] for _ in range(QUESTION_DIFFICULTY_BINS)]
+    _slots = {}
+    _synced = False
+    _synced_key = None
+    _tables = None
+    _flushed_at = time.time()
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def _ensure_loaded():
+        if QuestionStatsService._stats is None:
+            with app.app_context():
+                QuestionStatsService._stats = {
+                    row.question_id: [row.attempts, row.correct]
+                    for row in QuestionStats.query.all()
+                }
+    
+    @staticmethod
+    def difficulty(attempts, correct):
+        """Share of wrong answers, smoothed so unseen questions start at 0.5"""
+        return 1.0 - (correct + 1.0) / (attempts + 2.0)
+    
+    @staticmethod
+    def get_skill(user_id):
+        """Return player's recent accuracy (0.0 - 1.0)"""
+        return QuestionStatsService._skills.get(user_id, 0.5)
+    
+    @staticmethod
+    def _band(skill):
+        return min(int(skill * QUESTION_SKILL_BANDS), QUESTION_SKILL_BANDS - 1)
+    
+    @staticmethod
+    def _bin(question_id):
+        attempts, correct = QuestionStatsService._stats.get(question_id, (0, 0))
+        difficulty = QuestionStatsService.difficulty(attempts, correct)
+        return min(int(difficulty * QUESTION_DIFFICULTY_BINS), QUESTION_DIFFICULTY_BINS - 1)
+    
+    @staticmethod
+    def record(question_id, user_id, is_correct):
+        """Count one answer in memory and flush if the interval has passed"""
+        with QuestionStatsService._lock:
+            QuestionStatsService._ensure_loaded()
+            totals = QuestionStatsService._stats.setdefault(question_id, [0, 0])
+            pending = QuestionStatsService._pending.setdefault(question_id, [0, 0])
+            for counters in (totals, pending):
+                counters[0] += 1
+                counters[1] += int(bool(is_correct))
+            
+            if user_id is not None:
+                skill = QuestionStatsService.get_skill(user_id)
+                QuestionStatsService._skills[user_id] = skill + QUESTION_SKILL_ALPHA * (float(bool(is_correct)) - skill)
+            
+            if question_id in QuestionStatsService._slots:
+                QuestionStatsService._place(question_id)
+            due = time.time() - QuestionStatsService._flushed_at >= QUESTION_STATS_FLUSH_SECONDS
+        
+        if due:
+            QuestionStatsService.flush()
+    
+    @staticmethod
+    def flush():
+        """Write pending counters to question_stats in one transaction"""
+        with QuestionStatsService._lock:
+            pending = QuestionStatsService._pending
+            QuestionStatsService._pending = {}
+            QuestionStatsService._flushed_at = time.time()
+        
+        if not pending:
+            return
+        
+        with app.app_context():
+            try:
+                existing = {
+                    row.question_id: row
+                    for row in QuestionStats.query.filter(QuestionStats.question_id.in_(pending.keys()))
+                }
+                for question_id, (attempts, correct) in pending.items():
+                    row = existing.get(question_id)
+                    if row is None:
+                        db.session.add(QuestionStats(question_id=question_id, attempts=attempts, correct=correct))
+                    else:
+                        row.attempts += attempts
+                        row.correct += correct
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to flush question stats: {e}", exc_info=True)
+                with QuestionStatsService._lock:
+                    for question_id, (attempts, correct) in pending.items():
+                        counters = QuestionStatsService._pending.setdefault(question_id, [0, 0])
+                        counters[0] += attempts
+                        counters[1] += correct
+    
+    @staticmethod
+    def _place(question_id):
+        """Put question into the bin of its current difficulty (caller holds _lock)"""
+        slots = QuestionStatsService._slots
+        new_bin = QuestionStatsService._bin(question_id)
+        if question_id in slots:
+            if slots[question_id][0] == new_bin:
+                return
+            QuestionStatsService._remove(question_id)
+        
+        members = QuestionStatsService._bins[new_bin]
+        slots[question_id] = (new_bin, len(members))
+        members.append(question_id)
+        QuestionStatsService._tables = None
+    
+    @staticmethod
+    def _remove(question_id):
+        """Swap-remove question from its bin in O(1) (caller holds _lock)"""
+        slots = QuestionStatsService._slots
+        old_bin, position = slots.pop(question_id)
+        members = QuestionStatsService._bins[old_bin]
+        last = members.pop()
+        if last != question_id:
+            members[position] = last
+            slots[last] = (old_bin, position)
+        QuestionStatsService._tables = None
+    
+    @staticmethod
+    def _sync(question_ids):
+        """Add new and drop deleted questions after the question set changed (caller holds _lock)"""
+        for question_id in question_ids:
+            if question_id not in QuestionStatsService._slots:
+                QuestionStatsService._place(question_id)
+        for question_id in [q for q in QuestionStatsService._slots if q not in question_ids]:
+            QuestionStatsService._remove(question_id)
+        QuestionStatsService._synced = True
+        QuestionStatsService._synced_key = question_ids
+    
+    @staticmethod
+    def _build_tables():
+        """Build one alias table over the non-empty bins per skill band (bins x bands work)"""
+        filled = [b for b, members in enumerate(QuestionStatsService._bins) if members]
+        if not filled:
+            return []
+        
+        tables = []
+        for band in range(QUESTION_SKILL_BANDS):
+            target = (band + 0.5) / QUESTION_SKILL_BANDS
+            weights = [
+                len(QuestionStatsService._bins[b]) * (QUESTION_MIN_WEIGHT + math.exp(
+                    -(((b + 0.5) / QUESTION_DIFFICULTY_BINS - target) / QUESTION_DIFFICULTY_SPREAD) ** 2
+                ))
+                for b in filled
+            ]
+            tables.append(AliasTable(filled, weights))
+        return tables
+    
+    @staticmethod
+    def update_questions(question_ids, removed_ids=()):
+        """Place written questions and drop deleted ones without a full re-sync"""
+        with QuestionStatsService._lock:
+            if QuestionStatsService._stats is None:
+                return
+            for question_id in question_ids:
+                QuestionStatsService._place(question_id)
+            for question_id in removed_ids:
+                if question_id in QuestionStatsService._slots:
+                    QuestionStatsService._remove(question_id)
+    
+    @staticmethod
+    def invalidate():
+        """Re-sync bins with the answer key on the next sample (e.g. after questions are added or removed)"""
+        with QuestionStatsService._lock:
+            QuestionStatsService._synced = False
+    
+    @staticmethod
+    def sample_question_id(user_id=None):
+        """Draw a question id matched to the player's skill band"""
+        band = QuestionStatsService._band(QuestionStatsService.get_skill(user_id))
+        # A reload (e.g. questions written on another worker) returns a new dict
+        answer_key = QuizService.get_answer_key()
+        with QuestionStatsService._lock:
+            QuestionStatsService._ensure_loaded()
+            if not QuestionStatsService._synced or answer_key is not QuestionStatsService._synced_key:
+                QuestionStatsService._sync(answer_key)
+            if QuestionStatsService._tables is None:
+                QuestionStatsService._tables = QuestionStatsService._build_tables()
+            if not QuestionStatsService._tables:
+                return None
+            
+            members = QuestionStatsService._bins[QuestionStatsService._tables[band].sample()]
+            return random.choice(members)
+
+
+atexit.register(QuestionStatsService.flush)
+
+# ==================== SCORE HISTORY SERVICE ====================
+
+class ScoreHistoryService:
+    """Service for per-user score history"""
+    
+    @staticmethod
+    def encode_cursor(date_taken, score_id):
+        """Encode position of the last returned row as an opaque cursor"""
+        raw = json.dumps([date_taken.isoformat(), score_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Decode cursor produced by encode_cursor
+        
+        Returns:
+            tuple: (date_taken, score_id) or None if the cursor is invalid
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            date_taken, score_id = json.loads(raw)
+            return datetime.fromisoformat(date_taken), int(score_id)
+        except (ValueError, TypeError):
+            return None
+    
+    @staticmethod
+    def get_page(user_id, cursor=None, limit=HISTORY_PAGE_SIZE):
+        """
+        Get one page of score history, newest first
+        
+        Seeks on (user_id, date_taken, id) instead of using OFFSET, so a
+        deep page costs the same as the first one. Days that were compacted
+        into UserScoreDaily are returned as one item with id 0 at midnight,
+        which keeps them in the same (date_taken, id) order as raw rows.
+        
+        Returns:
+            tuple: (items, next_cursor)
+        """
+        raw_query = db.session.query(UserScore.id, UserScore.score, UserScore.date_taken).filter(
+            UserScore.user_id == user_id
+        )
+        daily_query = db.session.query(UserScoreDaily).filter(UserScoreDaily.user_id == user_id)
+        
+        if cursor:
+            date_taken, score_id = cursor
+            raw_query = raw_query.filter(
+                db.tuple_(UserScore.date_taken, UserScore.id) < db.tuple_(date_taken, score_id)
+            )
+            if score_id > 0:
+                daily_query = daily_query.filter(UserScoreDaily.day <= date_taken.date())
+            else:
+                daily_query = daily_query.filter(UserScoreDaily.day < date_taken.date())
+        
+        raw_rows = raw_query.order_by(
+            UserScore.date_taken.desc(), UserScore.id.desc()
+        ).limit(limit + 1).all()
+        daily_rows = daily_query.order_by(UserScoreDaily.day.desc()).limit(limit + 1).all()
+        
+        items = [(row.date_taken, row.id, row.score, 1) for row in raw_rows]
+        items += [
+            (datetime(row.day.year, row.day.month, row.day.day), 0, row.points, row.answers)
+            for row in daily_rows
+        ]
+        items.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = ScoreHistoryService.encode_cursor(items[-1][0], items[-1][1])
+        
+        return [
+            {
+                'id': score_id or None,
+                'score': score,
+                'answers': answers,
+                'date_taken': date_taken.isoformat(),
+                'compacted': score_id == 0
+            }
+            for date_taken, score_id, score, answers in items
+        ], next_cursor
+    
+    @staticmethod
+    def get_daily_totals(user_id, days=HISTORY_CHART_DAYS):
+        """Get answers and points per day for the last `days` days (whole UTC days)"""
+        since = (datetime.utcnow() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        day = db.func.date(UserScore.date_taken)
+        
+        rows = db.session.query(
+            day.label('day'),
+            db.func.count(UserScore.id).label('answers'),
+            db.func.sum(UserScore.score).label('points')
+        ).filter(
+            UserScore.user_id == user_id,
+            UserScore.date_taken >= since
+        ).group_by(day).all()
+        
+        # date() returns a string on SQLite but a date on other dialects
+        totals = {}
+        for row in rows:
+            key = row.day if isinstance(row.day, str) else row.day.isoformat()
+            totals[key] = {'date': key, 'answers': row.answers, 'points': row.points}
+        
+        compacted = UserScoreDaily.query.filter(
+            UserScoreDaily.user_id == user_id,
+            UserScoreDaily.day >= since.date()
+        ).all()
+        for row in compacted:
+            total = totals.setdefault(row.day.isoformat(), {'date': row.day.isoformat(), 'answers': 0, 'points': 0})
+            total['answers'] += row.answers
+            total['points'] += row.points
+        
+        return [totals[key] for key in sorted(totals)]
+
+# ==================== SCORE COMPACTION SERVICE ====================
+
+class ScoreCompactionService:
+    """Service for rolling old UserScore rows into per-day aggregates"""
+    
+    @staticmethod
+    def get_cutoff(older_than_days):
+        """Return midnight (UTC) before which rows are compacted"""
+        day = datetime.utcnow().date() - timedelta(days=older_than_days)
+        return datetime(day.year, day.month, day.day)
+    
+    @staticmethod
+    def compact(older_than_days=None, batch_size=None, archive_path=None, pause=0.0):
+        """
+        Compact UserScore rows older than `older_than_days` days
+        
+        Each batch is aggregated into UserScoreDaily and its raw rows are
+        deleted in one short transaction, so the SQLite write lock is only
+        held for one batch at a time. If `archive_path` is given, raw rows
+        are appended to that gzip JSONL file before they are deleted.
+        User.total_score is not touched.
+        
+        Returns:
+            dict: Compaction statistics
+        """
+        if older_than_days is None:
+            older_than_days = app.config['SCORE_RETENTION_DAYS']
+        if batch_size is None:
+            batch_size = app.config['SCORE_COMPACTION_BATCH_SIZE']
+        
+        cutoff = ScoreCompactionService.get_cutoff(older_than_days)
+        stats = {'cutoff': cutoff.isoformat(), 'rows': 0, 'batches': 0, 'archived': 0}
+        archive = gzip.open(archive_path, 'at', encoding='utf-8') if archive_path else None
+        
+        try:
+            while True:
+                rows = db.session.query(
+                    UserScore.id, UserScore.user_id, UserScore.score, UserScore.date_taken
+                ).filter(
+                    UserScore.date_taken < cutoff
+                ).order_by(UserScore.id).limit(batch_size).all()
+                
+                if not rows:
+                    break
+                
+                if archive:
+                    for row in rows:
+                        archive.write(json.dumps({
+                            'id': row.id,
+                            'user_id': row.user_id,
+                            'score': row.score,
+                            'date_taken': row.date_taken.isoformat()
+                        }) + '\n')
+                    archive.flush()
+                    stats['archived'] += len(rows)
+                
+                ScoreCompactionService._compact_batch(rows)
+                stats['rows'] += len(rows)
+                stats['batches'] += 1
+                
+                if pause:
+                    time.sleep(pause)
+        finally:
+            if archive:
+                archive.close()
+        
+        logger.info(f"Compacted {stats['rows']} score rows older than {stats['cutoff']} in {stats['batches']} batches")
+        return stats
+    
+    @staticmethod
+    def _compact_batch(rows):
+        """Merge one batch into UserScoreDaily and delete it in a single transaction"""
+        totals = {}
+        for row in rows:
+            key = (row.user_id, row.date_taken.date())
+            answers, points = totals.get(key, (0, 0))
+            totals[key] = (answers + 1, points + row.score)
+        
+        user_ids = {user_id for user_id, _ in totals}
+        days = {day for _, day in totals}
+        existing = {
+            (daily.user_id, daily.day): daily
+            for daily in UserScoreDaily.query.filter(
+                UserScoreDaily.user_id.in_(user_ids),
+                UserScoreDaily.day.in_(days)
+            )
+        }
+        
+        try:
+            for (user_id, day), (answers, points) in totals.items():
+                daily = existing.get((user_id, day))
+                if daily is None:
+                    db.session.add(UserScoreDaily(user_id=user_id, day=day, answers=answers, points=points))
+                else:
+                    daily.answers += answers
+                    daily.points += points
+            
+            UserScore.query.filter(UserScore.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+# ==================== QUESTION SEARCH SERVICE ====================
+
+class QuestionSearchService:
+    """
+    Full-text search over question text, options and topic
+    
+    Uses an SQLite FTS5 table kept in sync by triggers when the SQLite build
+    supports it; otherwise falls back to an in-process inverted index that
+    is updated by QuestionService on import and edit.
+    """
+    
+    SEARCH_COLUMNS = ('topic', 'question', 'option_a', 'option_b', 'option_c', 'option_d')
+    
+    _fts = None
+    _postings = None
+    _vocabulary = []
+    _documents = {}
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def tokenize(text):
+        return re.findall(r'\w+', (text or '').lower())
+    
+    @staticmethod
+    def setup():
+        """Create FTS5 table and sync triggers; returns True if FTS5 is used"""
+        if db.engine.dialect.name != 'sqlite':
+            QuestionSearchService._fts = False
+            return False
+        
+        columns = ', '.join(QuestionSearchService.SEARCH_COLUMNS)
+        new_values = ', '.join(f'new.{c}' for c in QuestionSearchService.SEARCH_COLUMNS)
+        old_values = ', '.join(f'old.{c}' for c in QuestionSearchService.SEARCH_COLUMNS)
+        
+        try:
+            with db.engine.begin() as connection:
+                exists = connection.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'quiz_question_fts'"
+                ).first()
+                if exists:
+                    QuestionSearchService._fts = True
+                    return True
+                
+                connection.exec_driver_sql(
+                    f"CREATE VIRTUAL TABLE quiz_question_fts USING fts5("
+                    f"{columns}, content='quiz_question', content_rowid='id')"
+                )
+                connection.exec_driver_sql(
+                    f"CREATE TRIGGER quiz_question_fts_ai AFTER INSERT ON quiz_question BEGIN "
+                    f"INSERT INTO quiz_question_fts(rowid, {columns}) VALUES (new.id, {new_values}); END"
+                )
+                connection.exec_driver_sql(
+                    f"CREATE TRIGGER quiz_question_fts_ad AFTER DELETE ON quiz_question BEGIN "
+                    f"INSERT INTO quiz_question_fts(quiz_question_fts, rowid, {columns}) "
+                    f"VALUES ('delete', old.id, {old_values}); END"
+                )
+                connection.exec_driver_sql(
+                    f"CREATE TRIGGER quiz_question_fts_au AFTER UPDATE ON quiz_question BEGIN "
+                    f"INSERT INTO quiz_question_fts(quiz_question_fts, rowid, {columns}) "
+                    f"VALUES ('delete', old.id, {old_values}); "
+                    f"INSERT INTO quiz_question_fts(rowid, {columns}) VALUES (new.id, {new_values}); END"
+                )
+                connection.exec_driver_sql("INSERT INTO quiz_question_fts(quiz_question_fts) VALUES ('rebuild')")
+            QuestionSearchService._fts = True
+            logger.info("Question search: using SQLite FTS5")
+        except OperationalError as e:
+            QuestionSearchService._fts = False
+            logger.warning(f"Question search: FTS5 unavailable ({e}), using in-process index")
+        return QuestionSearchService._fts
+    
+    @staticmethod
+    def uses_fts():
+        if QuestionSearchService._fts is None:
+            QuestionSearchService._fts = db.engine.dialect.name == 'sqlite' and db.session.execute(
+                db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'quiz_question_fts'")
+            ).first() is not None
+        return QuestionSearchService._fts
+    
+    @staticmethod
+    def _ensure_index():
+        """Build the fallback inverted index once"""
+        if QuestionSearchService._postings is not None:
+            return
+        QuestionSearchService._postings = {}
+        columns = [getattr(QuizQuestion, c) for c in QuestionSearchService.SEARCH_COLUMNS]
+        for row in db.session.query(QuizQuestion.id, *columns):
+            QuestionSearchService._index_document(row[0], row[1], row[1:])
+    
+    @staticmethod
+    def _index_document(question_id, topic, texts):
+        tokens = set()
+        for text in texts:
+            tokens.update(QuestionSearchService.tokenize(text))
+        QuestionSearchService._documents[question_id] = (topic, tokens)
+        for token in tokens:
+            if token not in QuestionSearchService._postings:
+                QuestionSearchService._postings[token] = set()
+                bisect.insort(QuestionSearchService._vocabulary, token)
+            QuestionSearchService._postings[token].add(question_id)
+    
+    @staticmethod
+    def _unindex_document(question_id):
+        document = QuestionSearchService._documents.pop(question_id, None)
+        if document is None:
+            return
+        for token in document[1]:
+            postings = QuestionSearchService._postings.get(token)
+            if postings is not None:
+                postings.discard(question_id)
+                if not postings:
+                    del QuestionSearchService._postings[token]
+                    vocabulary = QuestionSearchService._vocabulary
+                    del vocabulary[bisect.bisect_left(vocabulary, token)]
+    
+    @staticmethod
+    def unindex_question(question_id):
+        """Remove one deleted question from the fallback index"""
+        if QuestionSearchService.uses_fts():
+            return
+        with QuestionSearchService._lock:
+            if QuestionSearchService._postings is not None:
+                QuestionSearchService._unindex_document(question_id)
+    
+    @staticmethod
+    def index_question(question):
+        """Add or replace one question in the fallback index (FTS5 uses triggers)"""
+        if QuestionSearchService.uses_fts():
+            return
+        with QuestionSearchService._lock:
+            if QuestionSearchService._postings is None:
+                return
+            QuestionSearchService._unindex_document(question.id)
+            QuestionSearchService._index_document(
+                question.id, question.topic,
+                [getattr(question, c) for c in QuestionSearchService.SEARCH_COLUMNS]
+            )
+    
+    @staticmethod
+    def _match_fallback(terms):
+        """Return ids of questions containing every term (last term as prefix)"""
+        with QuestionSearchService._lock:
+            QuestionSearchService._ensure_index()
+            postings = QuestionSearchService._postings
+            
+            sets = [postings.get(term, set()) for term in terms[:-1]]
+            last = terms[-1]
+            vocabulary = QuestionSearchService._vocabulary
+            prefix_matches = set()
+            for i in range(bisect.bisect_left(vocabulary, last), len(vocabulary)):
+                if not vocabulary[i].startswith(last):
+                    break
+                prefix_matches |= postings[vocabulary[i]]
+            sets.append(prefix_matches)
+            
+            matched = set.intersection(*sorted(sets, key=len))
+            return {question_id: QuestionSearchService._documents[question_id][0] for question_id in matched}
+    
+    @staticmethod
+    def search(text='', topic=None, page=1, per_page=QUESTION_SEARCH_PAGE_SIZE):
+        """
+        Search questions, optionally within one topic
+        
+        Returns:
+            tuple: (questions, total, facets) where facets counts matches per topic
+        """
+        terms = QuestionSearchService.tokenize(text)
+        offset = (page - 1) * per_page
+        
+        if not terms:
+            query = QuizQuestion.query
+            facets = db.session.query(QuizQuestion.topic, db.func.count(QuizQuestion.id)).group_by(QuizQuestion.topic)
+            if topic:
+                query = query.filter(QuizQuestion.topic == topic)
+            total = query.count()
+            questions = query.order_by(QuizQuestion.id).offset(offset).limit(per_page).all()
+            return questions, total, [{'topic': t, 'count': c} for t, c in facets.all()]
+        
+        if QuestionSearchService.uses_fts():
+            match = ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+            facet_rows = db.session.execute(db.text(
+                "SELECT q.topic, COUNT(*) FROM quiz_question_fts f "
+                "JOIN quiz_question q ON q.id = f.rowid "
+                "WHERE quiz_question_fts MATCH :match GROUP BY q.topic"
+            ), {'match': match}).all()
+            facets = [{'topic': t, 'count': c} for t, c in facet_rows]
+            
+            ids = [row[0] for row in db.session.execute(db.text(
+                "SELECT q.id FROM quiz_question_fts f "
+                "JOIN quiz_question q ON q.id = f.rowid "
+                "WHERE quiz_question_fts MATCH :match AND (:topic IS NULL OR q.topic = :topic) "
+                "ORDER BY f.rank LIMIT :limit OFFSET :offset"
+            ), {'match': match, 'topic': topic, 'limit': per_page, 'offset': offset})]
+            total = sum(f['count'] for f in facets if not topic or f['topic'] == topic)
+        else:
+            matched = QuestionSearchService._match_fallback(terms)
+            counts = {}
+            for question_topic in matched.values():
+                counts[question_topic] = counts.get(question_topic, 0) + 1
+            facets = [{'topic': t, 'count': c} for t, c in sorted(counts.items())]
+            
+            ids = sorted(question_id for question_id, t in matched.items() if not topic or t == topic)
+            total = len(ids)
+            ids = ids[offset:offset + per_page]
+        
+        by_id = {q.id: q for q in QuizQuestion.query.filter(QuizQuestion.id.in_(ids))} if ids else {}
+        return [by_id[i] for i in ids if i in by_id], total, facets
+
+# ==================== QUESTION SERVICE ====================
+
+class QuestionService:
+    """Service for importing and editing quiz questions"""
+    
+    FIELDS = ('topic', 'question', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer')
+    
+    @staticmethod
+    def to_dict(question):
+        return {
+            'id': question.id,
+            'topic': question.topic,
+            'question': question.question,
+            'options': question.get_options(),
+            'correct_answer': question.correct_answer
+        }
+    
+    @staticmethod
+    def validate(data, partial=False):
+        """
+        Validate question fields
+        
+        Returns:
+            tuple: (clean_data, error_message)
+        """
+        if not isinstance(data, dict):
+            return None, 'Format pertanyaan tidak valid'
+        
+        clean = {}
+        for field in QuestionService.FIELDS:
+            if field not in data:
+                if partial:
+                    continue
+                return None, f'Field {field} harus diisi'
+            value = str(data[field] or '').strip()
+            if not value:
+                return None, f'Field {field} harus diisi'
+            max_length = getattr(QuizQuestion, field).type.length
+            if len(value) > max_length:
+                return None, f'Field {field} maksimal {max_length} karakter'
+            clean[field] = value
+        
+        if 'correct_answer' in clean:
+            clean['correct_answer'] = clean['correct_answer'].upper()
+            if clean['correct_answer'] not in ('A', 'B', 'C', 'D'):
+                return None, 'correct_answer harus A, B, C, atau D'
+        return clean, None
+    
+    @staticmethod
+    def _after_write(questions):
+        """
+        Keep answer key, sampler and search index in sync with written questions
+        
+        This worker updates its copies in place; the written ids are broadcast
+        as cache invalidations so other workers re-read just those questions.
+        """
+        answer_key = QuizService.get_answer_key()
+        for question in questions:
+            answer_key[question.id] = question.correct_answer
+            QuestionSearchService.index_question(question)
+        QuestionStatsService.update_questions([question.id for question in questions])
+        cache.invalidate(*[question_cache_key(question.id) for question in questions])
+    
+    @staticmethod
+    def import_questions(items):
+        """
+        Import a batch of questions in one transaction
+        
+        Returns:
+            tuple: (questions, error_message)
+        """
+        rows = []
+        for index, item in enumerate(items):
+            clean, error = QuestionService.validate(item)
+            if error:
+                return None, f'Pertanyaan #{index + 1}: {error}'
+            rows.append(QuizQuestion(**clean))
+        
+        db.session.add_all(rows)
         db.session.commit()
+        QuestionService._after_write(rows)
+        logger.info(f"Imported {len(rows)} quiz questions")
+        return rows, None
+    
+    @staticmethod
+    def update_question(question, data):
+        """
+        Update fields of one question
+        
+        Returns:
+            tuple: (question, error_message)
+        """
+        clean, error = QuestionService.validate(data, partial=True)
+        if error:
+            return None, error
         
-        score_record = UserScore(user_id=user.id, score=points)
-        db.session.add(score_record)
+        for field, value in clean.items():
+            setattr(question, field, value)
         db.session.commit()
+        QuestionService._after_write([question])
+        return question, None
+
+# ==================== QUIZ ROOM SERVICE ====================
+
+class QuizRoom:
+    """In-memory state of one multiplayer quiz room"""
+    
+    def __init__(self, code, host):
+        self.code = code
+        self.host_id = host.id
+        self.members = {}
+        self.scores = {}
+        self.subscribers = {}
+        self.round_number = 0
+        self.question = None
+        self.deadline = None
+        self.answers = {}
+        self.timer = None
+        self.last_activity = time.time()
+        self.lock = threading.Lock()
+    
+    @property
+    def round_open(self):
+        return self.deadline is not None and time.time() < self.deadline
+    
+    def to_dict(self):
+        """Return public room state (never includes the correct answer)"""
+        with self.lock:
+            return {
+                'code': self.code,
+                'host_id': self.host_id,
+                'players': len(self.members),
+                'round': self.round_number,
+                'round_open': self.round_open,
+                'deadline': self.deadline,
+                'scores': self.standings()
+            }
+    
+    def standings(self):
+        """Return room scores sorted from highest to lowest (caller holds self.lock)"""
+        ranking = sorted(self.scores.items(), key=lambda item: item[1], reverse=True)
+        return [
+            {'user_id': user_id, 'nickname': self.members[user_id], 'score': score}
+            for user_id, score in ranking
+        ]
+
+
+class QuizRoomService:
+    """Service for timed multiplayer quiz rooms kept in process memory"""
+    
+    _rooms = {}
+    _rooms_lock = threading.Lock()
     
     @staticmethod
-    def get_leaderboard(limit=LEADERBOARD_LIMIT):
-        """Get top players leaderboard"""
-        return db.session.query(User).order_by(User.total_score.desc()).limit(limit).all()
+    def _generate_code():
+        alphabet = string.ascii_uppercase + string.digits
+        while True:
+            code = ''.join(random.choices(alphabet, k=ROOM_CODE_LENGTH))
+            if code not in QuizRoomService._rooms:
+                return code
+    
+    @staticmethod
+    def _prune_idle_rooms():
+        """Drop rooms nobody has touched for ROOM_IDLE_SECONDS"""
+        cutoff = time.time() - ROOM_IDLE_SECONDS
+        for code in [c for c, room in QuizRoomService._rooms.items() if room.last_activity < cutoff]:
+            room = QuizRoomService._rooms.pop(code)
+            if room.timer:
+                room.timer.cancel()
+    
+    @staticmethod
+    def get_room(code):
+        """Get room by code"""
+        return QuizRoomService._rooms.get((code or '').upper())
+    
+    @staticmethod
+    def create_room(host):
+        """Create new room with the host as its first member"""
+        with QuizRoomService._rooms_lock:
+            QuizRoomService._prune_idle_rooms()
+            room = QuizRoom(QuizRoomService._generate_code(), host)
+            with room.lock:
+                room.members[host.id] = host.nickname
+                room.scores[host.id] = 0
+            QuizRoomService._rooms[room.code] = room
+        
+        logger.info(f"Quiz room {room.code} created by user {host.id}")
+        return room
+    
+    @staticmethod
+    def join_room(code, user):
+        """
+        Add user to room roster
+        
+        Returns:
+            tuple: (room, error_message)
+        """
+        room = QuizRoomService.get_room(code)
+        if not room:
+            return None, 'Room tidak ditemukan'
+        
+        with room.lock:
+            if user.id not in room.members:
+                if len(room.members) >= ROOM_MAX_PLAYERS:
+                    return None, 'Room sudah penuh'
+                room.members[user.id] = user.nickname
+                room.scores[user.id] = 0
+            room.last_activity = time.time()
+            players = len(room.members)
+        
+        QuizRoomService.broadcast(room, 'joined', {'nickname': user.nickname, 'players': players})
+        return room, None
+    
+    @staticmethod
+    def start_round(code, user):
+        """
+        Send the same question to every member and start the answer deadline
+        
+        Returns:
+            tuple: (room, error_message)
+        """
+        room = QuizRoomService.get_room(code)
+        if not room:
+            return None, 'Room tidak ditemukan'
+        if room.host_id != user.id:
+            return None, 'Hanya host yang dapat memulai ronde'
+        
+        question = QuizService.get_random_question()
+        if not question:
+            return None, 'Tidak ada pertanyaan tersedia'
+        
+        with room.lock:
+            if room.round_open:
+                return None, 'Ronde masih berlangsung'
+            room.round_number += 1
+            room.question = {
+                'id': question.id,
+                'question': question.question,
+                'options': question.get_options(),
+                'correct_answer': question.correct_answer
+            }
+            room.answers = {}
+            room.deadline = time.time() + ROOM_ANSWER_SECONDS
+            room.last_activity = time.time()
+            round_number = room.round_number
+            room.timer = threading.Timer(
+                ROOM_ANSWER_SECONDS, QuizRoomService.close_round, args=(room.code, round_number)
+            )
+            room.timer.daemon = True
+            room.timer.start()
+        
+        QuizRoomService.broadcast(room, 'question', {
+            'round': round_number,
+            'id': room.question['id'],
+            'question': room.question['question'],
+            'options': room.question['options'],
+            'deadline': room.deadline,
+            'seconds': ROOM_ANSWER_SECONDS
+        })
+        return room, None
+    
+    @staticmethod
+    def submit_answer(code, user, answer):
+        """
+        Record a member's answer for the current round
+        
+        Returns:
+            tuple: (accepted, error_message)
+        """
+        room = QuizRoomService.get_room(code)
+        if not room:
+            return False, 'Room tidak ditemukan'
+        with room.lock:
+            if user.id not in room.members:
+                return False, 'Anda belum bergabung di room ini'
+            if not room.round_open:
+                return False, 'Waktu menjawab sudah habis'
+            if user.id in room.answers:
+                return False, 'Jawaban sudah dikirim'
+            room.answers[user.id] = (answer or '').upper()
+            all_answered = len(room.answers) == len(room.members)
+            round_number = room.round_number
+        
+        if all_answered:
+            QuizRoomService.close_round(room.code, round_number)
+        return True, None
+    
+    @staticmethod
+    def close_round(code, round_number):
+        """Score the round, persist results in one batch and push them to members"""
+        room = QuizRoomService.get_room(code)
+        if not room:
+            return
+        
+        with room.lock:
+            if room.round_number != round_number or room.question is None or room.deadline is None:
+                return
+            if room.timer:
+                room.timer.cancel()
+                room.timer = None
+            correct_answer = room.question['correct_answer']
+            answers = room.answers
+            room.deadline = None
+            question_id = room.question['id']
+            winners = [user_id for user_id, answer in answers.items() if answer == correct_answer]
+            for user_id in winners:
+                room.scores[user_id] += QUIZ_POINTS_PER_QUESTION
+            winner_names = [room.members[user_id] for user_id in winners]
+            standings = room.standings()
+        
+        for user_id, answer in answers.items():
+            QuestionStatsService.record(question_id, user_id, answer == correct_answer)
+        QuizRoomService._persist_round(winners, QUIZ_POINTS_PER_QUESTION)
+        QuizRoomService.broadcast(room, 'results', {
+            'round': round_number,
+            'correct_answer': correct_answer,
+            'answered': len(answers),
+            'correct': winner_names,
+            'scores': standings
+        })
+    
+    @staticmethod
+    def _persist_round(user_ids, points):
+        """Write one round of correct answers with a single commit"""
+        if not user_ids:
+            return
+        
+        with app.app_context():
+            try:
+                User.query.filter(User.id.in_(user_ids)).update(
+                    {User.total_score: User.total_score + points},
+                    synchronize_session=False
+                )
+                db.session.add_all([UserScore(user_id=user_id, score=points) for user_id in user_ids])
+                db.session.commit()
+                cache.invalidate(*[user_cache_key(user_id) for user_id in user_ids])
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to persist room round: {e}", exc_info=True)
+    
+    @staticmethod
+    def subscribe(room, user_id):
+        """Register an event queue for a member"""
+        events = queue.Queue()
+        with room.lock:
+            room.subscribers[user_id] = events
+        return events
+    
+    @staticmethod
+    def unsubscribe(room, user_id, events):
+        """Remove member event queue if it is still the active one"""
+        with room.lock:
+            if room.subscribers.get(user_id) is events:
+                del room.subscribers[user_id]
+    
+    @staticmethod
+    def broadcast(room, event, data):
+        """Push an event to every subscribed member"""
+        message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        with room.lock:
+            subscribers = list(room.subscribers.values())
+        for events in subscribers:
+            events.put_nowait(message)
 
 # ==================== AUTH SERVICE ====================
 
@@ -254,6 +1533,120 @@ class AuthService:
             return user
         return None
 
+# ==================== ADMISSION CONTROL ====================
+
+class AdmissionService:
+    """
+    Reject excess requests immediately instead of queueing them
+    
+    Each endpoint class has a fixed number of concurrent slots, and quiz API
+    calls are additionally limited per user by a token bucket. Rejected
+    requests get 503 with Retry-After, so admitted requests keep bounded
+    latency instead of waiting on the SQLite lock.
+    """
+    
+    _slots = {
+        name: threading.BoundedSemaphore(limit)
+        for name, limit in app.config['ADMISSION_CONCURRENCY'].items()
+    }
+    _buckets = {}
+    _buckets_pruned_at = time.time()
+    _bucket_lock = threading.Lock()
+    
+    EXEMPT_ENDPOINTS = {'static', 'room_events'}
+    AUTH_ENDPOINTS = {'register', 'login', 'logout'}
+    
+    @staticmethod
+    def classify(endpoint, path):
+        """Return endpoint class for a request, or None if it is not limited"""
+        if endpoint is None or endpoint in AdmissionService.EXEMPT_ENDPOINTS:
+            return None
+        if endpoint in AdmissionService.AUTH_ENDPOINTS:
+            return 'auth'
+        if path.startswith('/api/'):
+            return 'quiz_api'
+        return 'pages'
+    
+    @staticmethod
+    def acquire(endpoint_class):
+        """Take a concurrency slot without waiting; returns False when full"""
+        return AdmissionService._slots[endpoint_class].acquire(blocking=False)
+    
+    @staticmethod
+    def release(endpoint_class):
+        AdmissionService._slots[endpoint_class].release()
+    
+    @staticmethod
+    def take_token(client_key):
+        """
+        Take one token from the client's bucket
+        
+        Returns:
+            float: 0 if allowed, otherwise seconds until a token is available
+        """
+        rate = app.config['QUIZ_RATE_LIMIT_PER_SECOND']
+        burst = app.config['QUIZ_RATE_LIMIT_BURST']
+        now = time.time()
+        
+        with AdmissionService._bucket_lock:
+            buckets = AdmissionService._buckets
+            if now - AdmissionService._buckets_pruned_at > 60:
+                idle = now - burst / rate
+                for key in [k for k, (_, updated) in buckets.items() if updated < idle]:
+                    del buckets[key]
+                AdmissionService._buckets_pruned_at = now
+            
+            tokens, updated = buckets.get(client_key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens < 1:
+                buckets[client_key] = (tokens, now)
+                return (1 - tokens) / rate
+            buckets[client_key] = (tokens - 1, now)
+            return 0
+    
+    @staticmethod
+    def reject(retry_after):
+        """Build 503 response with Retry-After"""
+        message = 'Server sedang sibuk, coba lagi sebentar lagi'
+        if request.path.startswith('/api/'):
+            response = jsonify({'error': message})
+        else:
+            response = app.make_response(render_template('error.html', error=message))
+        response.status_code = 503
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+
+@app.before_request
+def admit_request():
+    """Apply per-user rate limit and per-class concurrency limit"""
+    if not app.config['ADMISSION_CONTROL_ENABLED']:
+        return None
+    
+    endpoint_class = AdmissionService.classify(request.endpoint, request.path)
+    if endpoint_class is None:
+        return None
+    
+    if request.path.startswith('/api/quiz/'):
+        client_key = session.get('_user_id') or request.remote_addr
+        wait = AdmissionService.take_token(client_key)
+        if wait:
+            return AdmissionService.reject(wait)
+    
+    if not AdmissionService.acquire(endpoint_class):
+        logger.warning(f"Admission rejected: {endpoint_class} at capacity")
+        return AdmissionService.reject(app.config['ADMISSION_RETRY_AFTER'])
+    g.admission_class = endpoint_class
+    return None
+
+
+@app.teardown_request
+def release_admission(error):
+    """Release concurrency slot taken in admit_request"""
+    endpoint_class = g.pop('admission_class', None)
+    if endpoint_class is not None:
+        AdmissionService.release(endpoint_class)
+
 # ==================== ROUTES - AUTH ====================
 
 @app.route('/register', methods=['GET', 'POST'])
@@ -331,13 +1724,14 @@ def quiz():
 @login_required
 def next_question():
     """API: Get next quiz question"""
-    question = QuizService.get_random_question()
+    question = QuizService.get_random_question(current_user.id)
     
     if not question:
         return jsonify({'error': 'Tidak ada pertanyaan tersedia'}), 404
     
     return jsonify({
         'id': question.id,
+        'token': QuizService.issue_question_token(question, current_user.id),
         'question': question.question,
         'options': question.get_options()
     })
@@ -348,16 +1742,13 @@ def next_question():
 def submit_answer():
     """API: Submit quiz answer"""
     data = request.get_json() or {}
-    question_id = data.get('question_id')
+    token = data.get('token')
     answer = data.get('answer', '')
     
-    is_correct, correct_answer, question = QuizService.check_answer(question_id, answer)
+    is_correct, correct_answer, error = QuizService.check_answer(token, current_user, answer)
     
-    if is_correct is None:
-        return jsonify({'error': 'Pertanyaan tidak ditemukan'}), 404
-    
-    if is_correct:
-        QuizService.update_user_score(current_user, QUIZ_POINTS_PER_QUESTION)
+    if error:
+        return jsonify({'error': error}), 400
     
     return jsonify({
         'correct': is_correct,
@@ -365,6 +1756,186 @@ def submit_answer():
         'new_score': current_user.total_score
     })
 
+# ==================== ROUTES - QUIZ ROOMS ====================
+
+@app.route('/room')
+@app.route('/room/<code>')
+@login_required
+def quiz_room(code=None):
+    """Multiplayer quiz room page"""
+    return render_template('room.html', code=(code or '').upper(), answer_seconds=ROOM_ANSWER_SECONDS)
+
+
+@app.route('/api/rooms', methods=['POST'])
+@login_required
+def create_room():
+    """API: Create multiplayer quiz room"""
+    room = QuizRoomService.create_room(current_user)
+    return jsonify(room.to_dict()), 201
+
+
+@app.route('/api/rooms/<code>', methods=['GET'])
+@login_required
+def room_state(code):
+    """API: Get room state"""
+    room = QuizRoomService.get_room(code)
+    if not room:
+        return jsonify({'error': 'Room tidak ditemukan'}), 404
+    return jsonify(room.to_dict())
+
+
+@app.route('/api/rooms/<code>/join', methods=['POST'])
+@login_required
+def join_room(code):
+    """API: Join multiplayer quiz room"""
+    room, error = QuizRoomService.join_room(code, current_user)
+    if error:
+        status = 404 if not QuizRoomService.get_room(code) else 409
+        return jsonify({'error': error}), status
+    return jsonify(room.to_dict())
+
+
+@app.route('/api/rooms/<code>/start', methods=['POST'])
+@login_required
+def start_room_round(code):
+    """API: Start next round (host only)"""
+    room, error = QuizRoomService.start_round(code, current_user)
+    if error:
+        return jsonify({'error': error}), 409
+    return jsonify(room.to_dict())
+
+
+@app.route('/api/rooms/<code>/answer', methods=['POST'])
+@login_required
+def submit_room_answer(code):
+    """API: Submit answer for the current round"""
+    data = request.get_json() or {}
+    accepted, error = QuizRoomService.submit_answer(code, current_user, data.get('answer', ''))
+    if not accepted:
+        return jsonify({'error': error}), 409
+    return jsonify({'accepted': True})
+
+
+@app.route('/api/rooms/<code>/events')
+@login_required
+def room_events(code):
+    """API: Server-sent event stream of questions and round results"""
+    room = QuizRoomService.get_room(code)
+    if not room or current_user.id not in room.members:
+        return jsonify({'error': 'Room tidak ditemukan'}), 404
+    
+    user_id = current_user.id
+    events = QuizRoomService.subscribe(room, user_id)
+    
+    # The stream can stay open for the whole game; give the pooled DB
+    # connection back now instead of holding it until the client leaves
+    db.session.remove()
+    
+    def stream():
+        try:
+            yield f"event: state\ndata: {json.dumps(room.to_dict())}\n\n"
+            while True:
+                try:
+                    yield events.get(timeout=ROOM_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            QuizRoomService.unsubscribe(room, user_id, events)
+    
+    return Response(
+        stream(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# ==================== ROUTES - HISTORY ====================
+
+@app.route('/api/me/history', methods=['GET'])
+@login_required
+def score_history():
+    """API: Get current user's score history (keyset paginated)"""
+    limit = min(max(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), 1), HISTORY_MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor')
+    
+    position = None
+    if cursor:
+        position = ScoreHistoryService.decode_cursor(cursor)
+        if position is None:
+            return jsonify({'error': 'Cursor tidak valid'}), 400
+    
+    items, next_cursor = ScoreHistoryService.get_page(current_user.id, position, limit)
+    
+    result = {
+        'items': items,
+        'next_cursor': next_cursor
+    }
+    
+    # Chart data only accompanies the first page
+    if not cursor:
+        days = min(max(request.args.get('days', HISTORY_CHART_DAYS, type=int), 1), HISTORY_MAX_CHART_DAYS)
+        result['daily'] = ScoreHistoryService.get_daily_totals(current_user.id, days)
+    
+    return jsonify(result)
+
+# ==================== ROUTES - QUESTIONS ====================
+
+@app.route('/api/questions/search', methods=['GET'])
+@admin_required
+def search_questions():
+    """API: Search and browse quiz questions (admin)"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', QUESTION_SEARCH_PAGE_SIZE, type=int), 1), QUESTION_SEARCH_MAX_PAGE_SIZE)
+    topic = request.args.get('topic') or None
+    
+    questions, total, facets = QuestionSearchService.search(
+        request.args.get('q', ''), topic, page, per_page
+    )
+    
+    return jsonify({
+        'items': [QuestionService.to_dict(q) for q in questions],
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'facets': {'topic': facets}
+    })
+
+
+@app.route('/api/questions', methods=['POST'])
+@admin_required
+def import_questions():
+    """API: Import one question or a list of questions (admin)"""
+    data = request.get_json()
+    items = data if isinstance(data, list) else [data]
+    
+    questions, error = QuestionService.import_questions(items)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    return jsonify({'imported': len(questions), 'ids': [q.id for q in questions]}), 201
+
+
+@app.route('/api/questions/<int:question_id>', methods=['PUT'])
+@admin_required
+def update_question(question_id):
+    """API: Edit a question (admin)"""
+    question = db.session.get(QuizQuestion, question_id)
+    if not question:
+        return jsonify({'error': 'Pertanyaan tidak ditemukan'}), 404
+    
+    question, error = QuestionService.update_question(question, request.get_json() or {})
+    if error:
+        return jsonify({'error': error}), 400
+    
+    return jsonify(QuestionService.to_dict(question))
+
+# ==================== ROUTES - CACHE ====================
+
+@app.route('/api/cache/stats', methods=['GET'])
+@login_required
+def cache_stats():
+    """API: Cache hit-rate metrics per backend"""
+    return jsonify({'backend': app.config['CACHE_BACKEND'], 'stats': cache.stats()})
+
 # ==================== ROUTES - LEADERBOARD ====================
 
 @app.route('/leaderboard')
@@ -386,6 +1957,17 @@ def server_error(error):
     """Handle 500 errors"""
     return render_template('error.html', error='Terjadi kesalahan server'), 500
 
+
+@app.errorhandler(OperationalError)
+def database_busy(error):
+    """Answer 503 instead of 500 when SQLite stays locked past its timeout"""
+    db.session.rollback()
+    if 'locked' not in str(error.orig):
+        logger.error(f"Database error: {error}", exc_info=True)
+        return server_error(error)
+    logger.warning(f"Database busy: {error.orig}")
+    return AdmissionService.reject(app.config['ADMISSION_RETRY_AFTER'])
+
 # ==================== DATABASE INITIALIZATION ====================
 
 def init_sample_questions():
@@ -451,8 +2033,9 @@ def init_db():
     
     This function will:
     1. Create all tables if they don't exist
-    2. Populate sample quiz questions
-    3. Handle errors gracefully
+    2. Apply pending schema migrations (indexes for existing tables)
+    3. Populate sample quiz questions
+    4. Handle errors gracefully
     """
     with app.app_context():
         try:
@@ -471,11 +2054,25 @@ def init_db():
             db.create_all()
             logger.info("✅ Database tables created successfully")
             
+            # Apply schema migrations
+            logger.info("Applying schema migrations...")
+            applied = run_migrations(db.engine, app.config['SQLITE_JOURNAL_MODE'])
+            logger.info(f"✅ Migrations applied: {', '.join(applied) if applied else 'none pending'}")
+            
+            if db.engine.dialect.name == 'sqlite':
+                for name, plan in verify_query_plans(db.engine):
+                    logger.warning(f"⚠️  Query plan check failed for {name}: {plan}")
+            
             # Populate sample data
             logger.info("Initializing sample quiz questions...")
             init_sample_questions()
             logger.info("✅ Sample quiz questions initialized")
             
+            # Full-text search index
+            logger.info("Setting up question search index...")
+            fts = QuestionSearchService.setup()
+            logger.info(f"✅ Question search ready ({'SQLite FTS5' if fts else 'in-process index'})")
+            
             # Verify tables
             from sqlalchemy import inspect
             inspector = inspect(db.engine)
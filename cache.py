@@ -0,0 +1,394 @@
+"""
+Cache backends for Quiz Academy
+
+LocalCache keeps hot data in process memory (LRU). RedisCache and
+SQLiteCache are shared by every worker, so N workers share one warm cache
+instead of keeping N cold ones. TieredCache puts a LocalCache in front of a
+shared backend and broadcasts invalidations so every worker drops its local
+copy when data changes.
+"""
+import json
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict, namedtuple
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+INVALIDATION_CHANNEL = 'invalidate'
+
+# What TieredCache stores in a shared backend; expires_at caps local copies
+SharedEntry = namedtuple('SharedEntry', ['value', 'expires_at'])
+
+
+class CacheStats:
+    """Hit/miss counters of one backend"""
+    
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+    
+    def record(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+    
+    def to_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
+
+
+class LocalCache:
+    """In-process LRU cache with per-entry TTL"""
+    
+    name = 'local'
+    
+    def __init__(self, max_items=1024):
+        self.max_items = max_items
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return cached value or MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.time()):
+                self._entries.move_to_end(key)
+                self.stats.record(True)
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+        self.stats.record(False)
+        return MISSING
+    
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+    
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """Shared cache on a Redis-protocol server (requires the `redis` package)"""
+    
+    name = 'redis'
+    
+    def __init__(self, url, prefix='quiz-academy:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        
+        self.prefix = prefix
+        self.stats = CacheStats()
+        self.client = redis.Redis.from_url(url)
+    
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        self.stats.record(raw is not None)
+        return MISSING if raw is None else pickle.loads(raw)
+    
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl)
+    
+    def add(self, key, value, ttl=None):
+        """Store only if the key is absent; returns True if stored"""
+        return bool(self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl, nx=True))
+    
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+    
+    def publish(self, origin, keys):
+        """Broadcast invalidated keys to every worker"""
+        message = json.dumps({'origin': origin, 'keys': list(keys)})
+        self.client.publish(self.prefix + INVALIDATION_CHANNEL, message)
+    
+    def subscribe(self, callback):
+        """Call callback(origin, keys) for every invalidation, from a daemon thread"""
+        def listen():
+            while True:
+                try:
+                    pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self.prefix + INVALIDATION_CHANNEL)
+                    for message in pubsub.listen():
+                        data = json.loads(message['data'])
+                        callback(data['origin'], data['keys'])
+                except Exception as e:
+                    logger.warning(f"Cache invalidation listener error: {e}")
+                    time.sleep(1)
+        
+        threading.Thread(target=listen, name='cache-invalidation', daemon=True).start()
+
+
+class SQLiteCache:
+    """
+    Shared cache in a separate SQLite file
+    
+    Local stand-in for Redis: every worker on the same host opens the same
+    file. Invalidations are appended to a log table that each worker polls.
+    """
+    
+    name = 'sqlite'
+    
+    def __init__(self, path, poll_interval=1.0, log_retention=300):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.log_retention = log_retention
+        self.stats = CacheStats()
+        self._local = threading.local()
+        
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entry "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache_invalidation "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, keys TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        connection.commit()
+    
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.connection = connection
+        return connection
+    
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM cache_entry WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        self.stats.record(row is not None)
+        return MISSING if row is None else pickle.loads(row[0])
+    
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entry (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value), expires_at)
+        )
+    
+    def add(self, key, value, ttl=None):
+        """Store only if the key is absent or expired; returns True if stored"""
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO cache_entry (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE cache_entry.expires_at IS NOT NULL AND cache_entry.expires_at <= ?",
+            (key, pickle.dumps(value), now + ttl if ttl else None, now)
+        )
+        return cursor.rowcount == 1
+    
+    def delete(self, *keys):
+        if keys:
+            self._connection().executemany("DELETE FROM cache_entry WHERE key = ?", [(key,) for key in keys])
+    
+    def publish(self, origin, keys):
+        self._connection().execute(
+            "INSERT INTO cache_invalidation (origin, keys, created_at) VALUES (?, ?, ?)",
+            (origin, json.dumps(list(keys)), time.time())
+        )
+    
+    def subscribe(self, callback):
+        """Poll the invalidation log from a daemon thread"""
+        def poll():
+            row = self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM cache_invalidation").fetchone()
+            last_id = row[0]
+            pruned_at = time.time()
+            while True:
+                time.sleep(self.poll_interval)
+                try:
+                    connection = self._connection()
+                    rows = connection.execute(
+                        "SELECT id, origin, keys FROM cache_invalidation WHERE id > ? ORDER BY id",
+                        (last_id,)
+                    ).fetchall()
+                    for last_id, origin, keys in rows:
+                        callback(origin, json.loads(keys))
+                    
+                    if time.time() - pruned_at > self.log_retention:
+                        now = time.time()
+                        connection.execute("DELETE FROM cache_invalidation WHERE created_at < ?", (now - self.log_retention,))
+                        connection.execute("DELETE FROM cache_entry WHERE expires_at < ?", (now,))
+                        pruned_at = now
+                except Exception as e:
+                    logger.warning(f"Cache invalidation poll error: {e}")
+        
+        threading.Thread(target=poll, name='cache-invalidation', daemon=True).start()
+
+
+class TieredCache:
+    """
+    Local LRU in front of an optional shared backend
+    
+    Reads go local -> shared -> loader (read-through); writes go to both
+    tiers (write-through) and are broadcast so other workers drop their
+    local copy. Shared entries carry their expiry time, so a local copy
+    never outlives the shared entry it was read from. Errors from the
+    shared backend are logged and treated as misses, so a shared cache
+    outage only costs performance.
+    """
+    
+    def __init__(self, local, shared=None, local_ttl=30):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+        self.origin = uuid.uuid4().hex
+        self._claims = {}
+        self._claims_pruned_at = time.time()
+        self._claims_lock = threading.Lock()
+        self._listeners = []
+        if shared is not None:
+            shared.subscribe(self._on_invalidate)
+    
+    def _on_invalidate(self, origin, keys):
+        if origin != self.origin:
+            self.local.delete(*keys)
+            for listener in self._listeners:
+                try:
+                    listener(keys)
+                except Exception as e:
+                    logger.warning(f"Cache invalidation listener failed for {keys}: {e}")
+    
+    def subscribe(self, listener):
+        """Call listener(keys) when another worker invalidates keys (from a daemon thread)"""
+        self._listeners.append(listener)
+    
+    def _local_ttl(self, ttl):
+        # Local copies are only capped when another tier can change under them
+        if self.shared is None:
+            return ttl
+        return min(ttl, self.local_ttl) if ttl else self.local_ttl
+    
+    def get(self, key):
+        """Return cached value or MISSING"""
+        value = self.local.get(key)
+        if value is not MISSING or self.shared is None:
+            return value
+        
+        try:
+            entry = self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"Shared cache get failed for {key}: {e}")
+            return MISSING
+        
+        if not isinstance(entry, SharedEntry):
+            # Missing, or written by an older version without an expiry
+            return MISSING
+        value, expires_at = entry
+        ttl = self.local_ttl if expires_at is None else min(self.local_ttl, expires_at - time.time())
+        if ttl > 0:
+            self.local.set(key, value, ttl)
+        return value
+    
+    def set(self, key, value, ttl=None):
+        """Write-through: store in both tiers and drop other workers' local copies"""
+        self.local.set(key, value, self._local_ttl(ttl))
+        if self.shared is not None:
+            try:
+                self.shared.set(key, SharedEntry(value, time.time() + ttl if ttl else None), ttl)
+                self.shared.publish(self.origin, [key])
+            except Exception as e:
+                logger.warning(f"Shared cache set failed for {key}: {e}")
+    
+    def get_or_set(self, key, loader, ttl=None):
+        """Read-through: return cached value or load, store and return it"""
+        value = self.get(key)
+        if value is MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+    
+    def claim(self, key, ttl):
+        """
+        Atomically mark key as taken for ttl seconds; returns False if it already was
+        
+        Claims go to the shared backend so they hold across workers. Without
+        a shared backend (or while it is unreachable) they are kept in a
+        per-process table that is never evicted early, unlike the LRU.
+        """
+        if self.shared is not None:
+            try:
+                return self.shared.add(key, True, ttl)
+            except Exception as e:
+                logger.warning(f"Shared cache claim failed for {key}: {e}")
+        
+        now = time.time()
+        with self._claims_lock:
+            if now - self._claims_pruned_at > ttl:
+                self._claims = {k: expires for k, expires in self._claims.items() if expires > now}
+                self._claims_pruned_at = now
+            if self._claims.get(key, 0) > now:
+                return False
+            self._claims[key] = now + ttl
+        return True
+    
+    def release(self, key):
+        """Drop a claim so the key can be claimed again"""
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except Exception as e:
+                logger.warning(f"Shared cache release failed for {key}: {e}")
+        with self._claims_lock:
+            self._claims.pop(key, None)
+    
+    def invalidate(self, *keys):
+        """Delete keys from both tiers on every worker"""
+        if not keys:
+            return
+        self.local.delete(*keys)
+        if self.shared is not None:
+            try:
+                self.shared.delete(*keys)
+                self.shared.publish(self.origin, keys)
+            except Exception as e:
+                logger.warning(f"Shared cache invalidate failed for {keys}: {e}")
+    
+    def stats(self):
+        """Return hit-rate metrics per backend"""
+        backends = [self.local] + ([self.shared] if self.shared is not None else [])
+        return {backend.name: backend.stats.to_dict() for backend in backends}
+
+
+def create_cache(config):
+    """Build TieredCache from app config (CACHE_BACKEND = local | redis | sqlite)"""
+    local = LocalCache(config.get('CACHE_LOCAL_MAX_ITEMS', 1024))
+    backend = config.get('CACHE_BACKEND', 'local')
+    
+    if backend == 'redis':
+        shared = RedisCache(config['CACHE_REDIS_URL'])
+    elif backend == 'sqlite':
+        shared = SQLiteCache(config['CACHE_SQLITE_PATH'])
+    elif backend == 'local':
+        shared = None
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+    
+    logger.info(f"Cache backend: {backend}")
+    return TieredCache(local, shared, config.get('CACHE_LOCAL_TTL', 30))
@@ -0,0 +1,76 @@
+"""
+UserScore compaction script
+Jalankan ini secara berkala (mis. cron harian) untuk meringkas riwayat skor lama
+menjadi total per hari dan menjaga ukuran database tetap kecil
+"""
+import argparse
+import os
+import sys
+import logging
+
+# Setup logging before importing app
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('compact_scores.log'),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+try:
+    from app import app, db, ScoreCompactionService
+except ImportError as e:
+    logger.error(f"Failed to import app: {e}")
+    print("❌ ERROR: Could not import app module")
+    sys.exit(1)
+
+parser = argparse.ArgumentParser(description='Compact old UserScore rows into daily aggregates')
+parser.add_argument('--days', type=int, default=None,
+                    help='Compact rows older than this many days (default: SCORE_RETENTION_DAYS)')
+parser.add_argument('--batch-size', type=int, default=None,
+                    help='Rows per transaction (default: SCORE_COMPACTION_BATCH_SIZE)')
+parser.add_argument('--archive', default=None,
+                    help='Append raw rows to this gzip JSONL file before deleting them')
+parser.add_argument('--pause', type=float, default=0.05,
+                    help='Seconds to sleep between batches so other writers can get the lock')
+parser.add_argument('--vacuum', action='store_true',
+                    help='Run VACUUM afterwards to shrink the file (locks the database while running)')
+args = parser.parse_args()
+
+print("=" * 70)
+print("QUIZ ACADEMY - SCORE COMPACTION SCRIPT")
+print("=" * 70)
+
+try:
+    with app.app_context():
+        print("\n[1] Compacting score history...")
+        stats = ScoreCompactionService.compact(
+            older_than_days=args.days,
+            batch_size=args.batch_size,
+            archive_path=args.archive,
+            pause=args.pause
+        )
+        print(f"  Cutoff: {stats['cutoff']}")
+        print(f"  Rows compacted: {stats['rows']} ({stats['batches']} batches)")
+        if args.archive:
+            print(f"  Rows archived: {stats['archived']} → {os.path.abspath(args.archive)}")
+        
+        if args.vacuum:
+            print("\n[2] Running VACUUM...")
+            with db.engine.connect() as connection:
+                connection.exec_driver_sql("VACUUM")
+            print("  ✅ Database file compacted")
+    
+    print("\n" + "=" * 70)
+    print("✅ SCORE COMPACTION COMPLETE")
+    print("=" * 70)
+    
+except Exception as e:
+    print(f"\n❌ SCORE COMPACTION FAILED")
+    print(f"Error: {e}")
+    import traceback
+    traceback.print_exc()
+    logger.error(f"Score compaction failed: {e}", exc_info=True)
+    sys.exit(1)
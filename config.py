@@ -15,14 +15,43 @@ class Config:
         f"sqlite:///{os.path.join(BASE_DIR, 'quiz_academy.db')}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Set by migrations on startup; WAL lets readers continue while indexes are built
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
     SQLALCHEMY_ECHO = False
     
     # Security
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     
+    # Users allowed to search, import and edit questions (comma separated usernames)
+    ADMIN_USERNAMES = [u.strip() for u in os.environ.get('ADMIN_USERNAMES', '').split(',') if u.strip()]
+    
     # API
     WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY')
     
+    # Cache - 'local' (per process), 'sqlite' (shared file on this host) or 'redis' (shared server)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH', os.path.join(BASE_DIR, 'quiz_cache.db'))
+    CACHE_LOCAL_MAX_ITEMS = int(os.environ.get('CACHE_LOCAL_MAX_ITEMS', 2048))
+    CACHE_LOCAL_TTL = int(os.environ.get('CACHE_LOCAL_TTL', 30))
+    
+    # Admission control - concurrent requests per endpoint class, beyond that 503 + Retry-After
+    ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true'
+    ADMISSION_CONCURRENCY = {
+        'auth': int(os.environ.get('ADMISSION_AUTH_CONCURRENCY', 4)),
+        'quiz_api': int(os.environ.get('ADMISSION_API_CONCURRENCY', 16)),
+        'pages': int(os.environ.get('ADMISSION_PAGES_CONCURRENCY', 8)),
+    }
+    ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 1))
+    
+    # Per-user token bucket for /api/quiz/*
+    QUIZ_RATE_LIMIT_PER_SECOND = float(os.environ.get('QUIZ_RATE_LIMIT_PER_SECOND', 2))
+    QUIZ_RATE_LIMIT_BURST = int(os.environ.get('QUIZ_RATE_LIMIT_BURST', 10))
+    
+    # Score retention - UserScore rows older than this are compacted into daily totals
+    SCORE_RETENTION_DAYS = int(os.environ.get('SCORE_RETENTION_DAYS', 90))
+    SCORE_COMPACTION_BATCH_SIZE = int(os.environ.get('SCORE_COMPACTION_BATCH_SIZE', 1000))
+    
     # Database Pool - SQLite specific settings
     SQLALCHEMY_ENGINE_OPTIONS = {
         'connect_args': {
@@ -19,6 +19,7 @@ logger = logging.getLogger(__name__)
 
 try:
     from app import app, db, init_db
+    from migrations import get_applied_versions, verify_query_plans
 except ImportError as e:
     logger.error(f"Failed to import app: {e}")
     print("❌ ERROR: Could not import app module")
@@ -52,14 +53,29 @@ try:
     print("\n[3] Verifying database...")
     from sqlalchemy import inspect
     
-    inspector = inspect(db.engine)
-    tables = inspector.get_table_names()
-    
-    print(f"\n  ✅ Database created successfully!")
-    print(f"  Tables created: {len(tables)}")
-    for table in tables:
-        columns = inspector.get_columns(table)
-        print(f"    - {table} ({len(columns)} columns)")
+    with app.app_context():
+        inspector = inspect(db.engine)
+        tables = inspector.get_table_names()
+        
+        print(f"\n  ✅ Database created successfully!")
+        print(f"  Tables created: {len(tables)}")
+        for table in tables:
+            columns = inspector.get_columns(table)
+            print(f"    - {table} ({len(columns)} columns)")
+        
+        print("\n[4] Verifying migrations & query plans...")
+        versions = sorted(get_applied_versions(db.engine))
+        print(f"  Schema migrations applied: {', '.join(map(str, versions)) or 'none'}")
+        
+        if db.engine.dialect.name == 'sqlite':
+            failures = verify_query_plans(db.engine)
+            if failures:
+                for name, plan in failures:
+                    print(f"  ❌ {name}: {' | '.join(plan)}")
+                raise RuntimeError(f"{len(failures)} query plan check(s) failed")
+            print("  ✅ Hot-path queries use their indexes")
+        else:
+            print(f"  Query plan checks skipped ({db.engine.dialect.name})")
     
     print("\n" + "=" * 70)
     print("✅ DATABASE CREATION COMPLETE")
@@ -0,0 +1,127 @@
+"""
+Versioned schema migrations for Quiz Academy
+
+db.create_all() only creates missing tables, so changes to existing tables
+(new indexes on hot query paths) are applied here. Each migration runs once
+and is recorded in schema_migrations. Every statement runs in its own short
+transaction and is idempotent, so an interrupted migration can simply be
+run again.
+"""
+import time
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = [
+    (1, 'hot_path_indexes', [
+        # Leaderboard: ORDER BY total_score DESC LIMIT n
+        'CREATE INDEX IF NOT EXISTS ix_user_total_score ON "user" (total_score)',
+        # Score history seek; makes the single-column user_id index redundant
+        'CREATE INDEX IF NOT EXISTS ix_user_score_user_date_id ON user_score (user_id, date_taken, id, score)',
+        'DROP INDEX IF EXISTS ix_user_score_user_id',
+        # Questions by topic ordered by id
+        'CREATE INDEX IF NOT EXISTS ix_quiz_question_topic_id ON quiz_question (topic, id)',
+        'DROP INDEX IF EXISTS ix_quiz_question_topic',
+    ]),
+]
+
+# (name, SQL mirroring an app query, index the plan must use)
+QUERY_PLAN_CHECKS = [
+    (
+        'leaderboard',
+        'SELECT * FROM "user" ORDER BY total_score DESC LIMIT 10',
+        'ix_user_total_score'
+    ),
+    (
+        'score history page',
+        "SELECT id, score, date_taken FROM user_score WHERE user_id = 1 "
+        "AND (date_taken, id) < ('9999-12-31 00:00:00', 0) ORDER BY date_taken DESC, id DESC LIMIT 21",
+        'ix_user_score_user_date_id'
+    ),
+    (
+        'questions by topic',
+        "SELECT * FROM quiz_question WHERE topic = 'AI Development' ORDER BY id LIMIT 20",
+        'ix_quiz_question_topic_id'
+    ),
+]
+
+
+def get_applied_versions(engine):
+    """Return set of applied migration versions, creating the tracking table if needed"""
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_migrations "
+            "(version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at REAL NOT NULL)"
+        )
+        return {row[0] for row in connection.exec_driver_sql("SELECT version FROM schema_migrations")}
+
+
+def run_migrations(engine, journal_mode=None):
+    """
+    Apply pending migrations
+    
+    With journal_mode='WAL' readers keep working while an index is being
+    built; only other writers wait, and only for one statement at a time.
+    
+    Returns:
+        list: Names of migrations applied in this run
+    """
+    if journal_mode and engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            mode = connection.exec_driver_sql(f"PRAGMA journal_mode={journal_mode}").scalar()
+            logger.info(f"SQLite journal mode: {mode}")
+    
+    applied = get_applied_versions(engine)
+    ran = []
+    
+    for version, name, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        
+        logger.info(f"Applying migration {version:03d}_{name}...")
+        for statement in statements:
+            started = time.time()
+            with engine.begin() as connection:
+                connection.exec_driver_sql(statement)
+            logger.info(f"  {statement} ({time.time() - started:.2f}s)")
+        
+        with engine.begin() as connection:
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {'version': version, 'name': name, 'applied_at': time.time()}
+            )
+        ran.append(f"{version:03d}_{name}")
+    
+    if ran and engine.dialect.name == 'sqlite':
+        # Refresh planner statistics for the new indexes (bounded work on large tables)
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA optimize")
+    
+    return ran
+
+
+def explain(engine, sql):
+    """Return EXPLAIN QUERY PLAN detail lines for a query (SQLite only)"""
+    with engine.connect() as connection:
+        return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def verify_query_plans(engine):
+    """
+    Check that hot-path queries use their index and need no temp sort
+    
+    Uses SQLite's EXPLAIN QUERY PLAN; callers skip it on other dialects.
+    
+    Returns:
+        list: (name, plan) for every check that failed
+    """
+    failures = []
+    for name, sql, index in QUERY_PLAN_CHECKS:
+        plan = explain(engine, sql)
+        uses_index = any(index in line for line in plan)
+        sorts = any('TEMP B-TREE' in line for line in plan)
+        if not uses_index or sorts:
+            failures.append((name, plan))
+    return failures